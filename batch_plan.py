@@ -0,0 +1,210 @@
+"""Headless batch meal planning.
+
+Reads one household per line from a JSONL file:
+
+    {"id": "smith", "days": {"mon": "chicken breast\\nbroccoli", "wed": "lentils", "fri": "salmon"}}
+
+and runs the same meal and shopping-list pipeline as the web UI for each of them,
+a few households at a time. Results are appended to the output (.jsonl or .csv) as
+soon as each household finishes, and finished ids are recorded in a checkpoint file
+next to it, so re-running the same command after a crash skips completed households.
+
+    python batch_plan.py households.jsonl -o plans.jsonl --concurrency 4
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import statistics
+import time
+
+from config import *  # Import configuration values
+import meal_planner
+from meal_planner import configure_logging, generate_meal, generate_shopping_list, logger
+
+DAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+ERROR_TITLE_PREFIXES = ("Invalid response format", "Error", "HTTP error", "Unexpected error")
+
+
+class HouseholdError(Exception):
+    pass
+
+
+def valid_day(ingredients):
+    if isinstance(ingredients, list):
+        return all(isinstance(ingredient, str) for ingredient in ingredients)
+    return isinstance(ingredients, str)
+
+
+def read_households(path, invalid):
+    # Lines that are not a valid household are logged, added to `invalid` and skipped
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                household = json.loads(line)
+            except json.JSONDecodeError as e:
+                household = None
+                logger.error(f"{path}:{line_number}: invalid JSON, skipping: {str(e)}")
+            else:
+                if not isinstance(household, dict) or "id" not in household or not isinstance(household.get("days"), dict):
+                    logger.error(f"{path}:{line_number}: expected an object with 'id' and 'days', skipping")
+                    household = None
+                elif not all(valid_day(value) for value in household["days"].values()):
+                    logger.error(f"{path}:{line_number}: each day must be a string or a list of strings, skipping")
+                    household = None
+            if household is None:
+                invalid.append(line_number)
+                continue
+            household["id"] = str(household["id"])
+            yield household
+
+
+def read_checkpoint(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+async def plan_household(household):
+    meals = {}
+    for day in DAYS:
+        ingredients = household["days"].get(day, "")
+        if isinstance(ingredients, list):
+            ingredients = "\n".join(ingredients)
+        ingredients = ingredients.strip()
+        if not ingredients:
+            continue
+        other_meals = ", ".join(f"{d.capitalize()}: {meal['title']}" for d, meal in meals.items())
+        meal = await generate_meal(ingredients, other_meals)
+        if meal['title'].startswith(ERROR_TITLE_PREFIXES):
+            raise HouseholdError(f"{day}: {meal['title']}")
+        meals[day] = meal
+
+    meals_and_ingredients = "\n\n".join(
+        f"{day.capitalize()}: {meal['title']}\nIngredients: {meal['ingredients']}" for day, meal in meals.items()
+    )
+    shopping_list = await generate_shopping_list(meals_and_ingredients)
+    if shopping_list and shopping_list[0]['item'] == "Error generating shopping list":
+        raise HouseholdError(f"shopping list: {', '.join(shopping_list[0]['meals'])}")
+    return {"id": household["id"], "meals": meals, "shopping_list": shopping_list}
+
+
+class ResultWriter:
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.checkpoint_path = f"{output_path}.checkpoint"
+        self.is_csv = output_path.endswith(".csv")
+        new_file = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+        self.output = open(output_path, "a", newline="")
+        self.checkpoint = open(self.checkpoint_path, "a")
+        if self.is_csv:
+            self.writer = csv.writer(self.output)
+            if new_file:
+                self.writer.writerow(['Household', 'Item', 'Meals'])
+
+    def write(self, plan):
+        if self.is_csv:
+            for item in plan["shopping_list"]:
+                self.writer.writerow([plan["id"], item['item'], ', '.join(item['meals'])])
+        else:
+            self.output.write(json.dumps(plan) + "\n")
+        self.output.flush()
+        # Only checkpoint once the result itself is on disk
+        self.checkpoint.write(plan["id"] + "\n")
+        self.checkpoint.flush()
+
+    def close(self):
+        self.output.close()
+        self.checkpoint.close()
+
+
+async def run_batch(input_path, output_path, concurrency=BATCH_CONCURRENCY):
+    writer = ResultWriter(output_path)
+    seen = read_checkpoint(writer.checkpoint_path)
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    latencies = []
+    failed = []
+    invalid = []
+    skipped = 0
+
+    async def worker():
+        while True:
+            household = await queue.get()
+            try:
+                if household is None:
+                    return
+                start = time.perf_counter()
+                try:
+                    plan = await plan_household(household)
+                except Exception as e:
+                    logger.error(f"Household {household['id']} failed: {str(e)}")
+                    failed.append(household["id"])
+                    continue
+                try:
+                    writer.write(plan)
+                except Exception as e:
+                    # Not checkpointed, so the household is planned again on the next run
+                    logger.error(f"Household {household['id']} could not be written: {str(e)}")
+                    failed.append(household["id"])
+                    continue
+                latencies.append(time.perf_counter() - start)
+                logger.info(f"Household {household['id']} planned in {latencies[-1]:.1f}s")
+            finally:
+                queue.task_done()
+
+    start = time.perf_counter()
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        for household in read_households(input_path, invalid):
+            if household["id"] in seen:
+                skipped += 1
+                continue
+            seen.add(household["id"])
+            await queue.put(household)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "planned": len(latencies),
+        "failed": failed,
+        "skipped": skipped,
+        "invalid": invalid,
+        "elapsed": elapsed,
+        "households_per_minute": len(latencies) / elapsed * 60 if elapsed else 0.0,
+        "median_latency": statistics.median(latencies) if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file with one household per line")
+    parser.add_argument("-o", "--output", required=True, help="Output file, .jsonl or .csv")
+    parser.add_argument("-c", "--concurrency", type=int, default=BATCH_CONCURRENCY,
+                        help="Households planned at the same time")
+    args = parser.parse_args()
+
+    configure_logging()
+    # The server may be running and using the cache files, so this run keeps its own cache in memory
+    meal_planner.shared_semantic_cache = False
+    stats = asyncio.run(run_batch(args.input, args.output, max(1, args.concurrency)))
+    print(f"Planned {stats['planned']} households in {stats['elapsed']:.1f}s "
+          f"({stats['households_per_minute']:.1f}/min, median {stats['median_latency']:.1f}s per household), "
+          f"skipped {stats['skipped']} already finished, {len(stats['failed'])} failed")
+    if stats["invalid"]:
+        print(f"Skipped {len(stats['invalid'])} invalid input lines: {', '.join(map(str, stats['invalid']))}")
+    if stats["failed"]:
+        print(f"Failed households (re-run to retry): {', '.join(stats['failed'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+
+logger = logging.getLogger("meal_planner.batching")
+
+
+class MicroBatcher:
+    """Collects concurrent requests and runs them together as one batch.
+
+    A batch is sent when `max_size` requests are waiting, when the oldest has waited
+    `window` seconds, or straight away while fewer than `max_in_flight` batches are
+    running, so a lone request on an idle backend is not delayed. `run_batch(requests)`
+    returns one result per request, None where it has none; those requests, and every
+    request of a batch that raises, fall back to `run_one(request)`."""
+
+    def __init__(self, name, run_batch, run_one, window, max_size, max_in_flight=1):
+        self.name = name
+        self.run_batch = run_batch
+        self.run_one = run_one
+        self.window = window
+        self.max_size = max_size
+        self.max_in_flight = max_in_flight
+        self.pending = []
+        self.timer = None
+        self.in_flight = 0
+        self.tasks = set()
+        self.stats = {"requests": 0, "batches": 0, "batched_requests": 0, "singles": 0, "fallbacks": 0}
+
+    async def submit(self, request):
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((request, future))
+        self.stats["requests"] += 1
+        if len(self.pending) >= self.max_size or self.in_flight < self.max_in_flight:
+            self.flush()
+        elif self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(self.window, self.flush)
+        return await future
+
+    def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        # Requests whose caller has gone away are dropped rather than generated
+        self.pending = [(request, future) for request, future in self.pending if not future.done()]
+        if not self.pending:
+            return
+        batch, self.pending = self.pending[:self.max_size], self.pending[self.max_size:]
+        self.in_flight += 1
+        task = asyncio.create_task(self.run(batch))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        if self.pending:
+            self.timer = asyncio.get_running_loop().call_later(self.window, self.flush)
+
+    async def run(self, batch):
+        try:
+            results = [None] * len(batch)
+            if len(batch) == 1:
+                self.stats["singles"] += 1
+            else:
+                self.stats["batches"] += 1
+                self.stats["batched_requests"] += len(batch)
+                try:
+                    results = await self.run_batch([request for request, _ in batch])
+                except Exception as e:
+                    logger.warning(f"{self.name} batch of {len(batch)} failed, running individually: {str(e)}")
+                self.stats["fallbacks"] += sum(result is None for result in results)
+                logger.info(f"{self.name} batch of {len(batch)} answered {len(batch) - results.count(None)} requests")
+
+            for (request, future), result in zip(batch, results):
+                if result is not None and not future.done():
+                    future.set_result(result)
+            await asyncio.gather(*(self.run_single(request, future)
+                                   for (request, future), result in zip(batch, results) if result is None))
+        finally:
+            self.in_flight -= 1
+            # The backend has capacity again, so waiting requests need not sit out the window
+            if self.pending and self.in_flight < self.max_in_flight:
+                self.flush()
+
+    async def run_single(self, request, future):
+        try:
+            result = await self.run_one(request)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    def metrics(self):
+        batches = self.stats["batches"]
+        return {
+            **self.stats,
+            "pending": len(self.pending),
+            "in_flight": self.in_flight,
+            "mean_batch_size": self.stats["batched_requests"] / batches if batches else None,
+        }
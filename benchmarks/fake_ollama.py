@@ -0,0 +1,158 @@
+"""A stand-in for the Ollama HTTP API, for benchmarking without a GPU.
+
+    python benchmarks/fake_ollama.py --port 11435
+    MEAL_PLANNER_OLLAMA_URL=http://localhost:11435/api/generate \\
+    MEAL_PLANNER_OLLAMA_EMBED_URL=http://localhost:11435/api/embeddings python ...
+
+Latency follows a simple model: prompt tokens and output tokens each cost a fixed time,
+scaled down for small ("1b"/"3b") models, and only --parallel requests are processed at
+once, like a single Ollama server. Output is cut off at the request's num_predict, so
+too-tight limits produce truncated, invalid JSON just as they would for real.
+"""
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import json
+import re
+
+import numpy as np
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+PROMPT_MS_PER_TOKEN = 0.5
+OUTPUT_MS_PER_TOKEN = 20.0
+SMALL_MODEL_SPEEDUP = {"1b": 0.3, "3b": 0.6}
+EMBEDDING_DIM = 256
+
+settings = {"parallel": 1, "speed": 1.0}
+slots = None
+
+
+def count_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def model_speed(model):
+    return next((factor for size, factor in SMALL_MODEL_SPEEDUP.items() if size in model), 1.0) * settings["speed"]
+
+
+def meals_section(prompt):
+    match = re.search(r"for the week:\n(.*?)\n\s*Please follow", prompt, re.S)
+    return match.group(1) if match else ""
+
+
+def fake_shopping_list(prompt):
+    items = {}
+    meal = "Miscellaneous"
+    for line in meals_section(prompt).splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if re.match(r"^(Mon|Tue|Wed|Thu|Fri|Sat|Sun):", line):
+            meal = line
+            continue
+        for ingredient in line.removeprefix("Ingredients:").split(","):
+            ingredient = ingredient.strip().capitalize()
+            if ingredient:
+                items.setdefault(ingredient, []).append(meal)
+    return {"shopping_list": [{"item": item, "meals": meals} for item, meals in items.items()]}
+
+
+def fake_meal(prompt):
+    match = re.search(r"Given these ingredients: (.*?), suggest", prompt, re.S)
+    ingredients = [i.strip() for i in re.split(r"[\n,]", match.group(1) if match else "") if i.strip()]
+    title = " and ".join(ingredients[:2]).title() or "House Special"
+    return {"title": f"{title} Skillet", "ingredients": "\n".join(ingredients + ["olive oil", "garlic", "salt"])}
+
+
+def fake_meal_batch(prompt):
+    meals = []
+    for meal_id, ingredients in re.findall(r"- id (\d+): ingredients: (.*?) \| other meals:", prompt):
+        meal = fake_meal(f"Given these ingredients: {ingredients}, suggest")
+        meals.append({"id": int(meal_id), **meal})
+    return {"meals": meals}
+
+
+def fake_ingredients():
+    return {"ingredients": ["Chicken thighs", "Cod", "Chickpeas", "Eggs", "Pork loin", "Tempeh",
+                            "Kale", "Carrots", "Farro", "Pomegranate"]}
+
+
+def fake_response(prompt):
+    if "independent requests" in prompt:
+        return fake_meal_batch(prompt)
+    if "shopping list" in prompt:
+        return fake_shopping_list(prompt)
+    if "primary ingredients" in prompt:
+        return fake_ingredients()
+    return fake_meal(prompt)
+
+
+def truncate(text, num_predict):
+    if num_predict is None or num_predict < 0:
+        return text
+    return text[:num_predict * 4]
+
+
+async def stream_tokens(body, prompt, text, speed):
+    async with slots:
+        await asyncio.sleep(count_tokens(prompt) * PROMPT_MS_PER_TOKEN * speed / 1000)
+        for start in range(0, len(text), 4):
+            await asyncio.sleep(OUTPUT_MS_PER_TOKEN * speed / 1000)
+            yield json.dumps({"model": body.get("model"), "response": text[start:start + 4], "done": False}) + "\n"
+    yield json.dumps({"model": body.get("model"), "response": "", "done": True,
+                      "prompt_eval_count": count_tokens(prompt), "eval_count": count_tokens(text)}) + "\n"
+
+
+async def generate(request):
+    body = await request.json()
+    prompt = body.get("prompt", "")
+    options = body.get("options") or {}
+    text = truncate(json.dumps(fake_response(prompt)), options.get("num_predict"))
+    speed = model_speed(body.get("model", ""))
+    if body.get("stream", True):
+        return StreamingResponse(stream_tokens(body, prompt, text, speed), media_type="application/x-ndjson")
+    delay = (count_tokens(prompt) * PROMPT_MS_PER_TOKEN + count_tokens(text) * OUTPUT_MS_PER_TOKEN) * speed / 1000
+    async with slots:
+        await asyncio.sleep(delay)
+    return JSONResponse({"model": body.get("model"), "response": text, "done": True,
+                         "prompt_eval_count": count_tokens(prompt), "eval_count": count_tokens(text)})
+
+
+async def embeddings(request):
+    body = await request.json()
+    # Hashed bag of words: the same words in any order give the same vector
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    for word in re.findall(r"\w+", body.get("prompt", "").lower()):
+        vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % EMBEDDING_DIM] += 1.0
+    return JSONResponse({"embedding": vector.tolist()})
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    global slots
+    slots = asyncio.Semaphore(settings["parallel"])
+    yield
+
+
+app = Starlette(routes=[
+    Route("/api/generate", generate, methods=["POST"]),
+    Route("/api/embeddings", embeddings, methods=["POST"]),
+], lifespan=lifespan)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--parallel", type=int, default=1, help="Requests processed at once")
+    parser.add_argument("--speed", type=float, default=1.0, help="Latency multiplier, 0 for no delay")
+    args = parser.parse_args()
+    settings.update(parallel=args.parallel, speed=args.speed)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
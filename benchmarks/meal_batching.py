@@ -0,0 +1,84 @@
+"""Latency and backend calls for bursts of concurrent meal requests, with and without batching.
+
+    python benchmarks/fake_ollama.py &
+    MEAL_PLANNER_OLLAMA_URL=http://localhost:11435/api/generate \\
+        python benchmarks/meal_batching.py --concurrency 8 --windows 50 100 200 --sizes 2 4 8
+
+Each configuration fires --concurrency generate_meal() calls at once, --rounds times.
+"calls" counts generations sent to the backend, batched or not.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+INGREDIENTS = ["chicken breast\nbroccoli", "lentils\nspinach", "salmon", "ground beef\nblack beans",
+               "tofu\nbok choy", "pork loin\napples", "chickpeas\ncauliflower", "shrimp\nzucchini"]
+
+
+async def burst(concurrency):
+    from meal_planner import generate_meal
+
+    async def one(n):
+        start = time.perf_counter()
+        meal = await generate_meal(INGREDIENTS[n % len(INGREDIENTS)], "")
+        return time.perf_counter() - start, not meal['title'].startswith(("Invalid response format", "Error", "HTTP error", "Unexpected error"))
+
+    return await asyncio.gather(*(one(n) for n in range(concurrency)))
+
+
+async def run(label, concurrency, rounds):
+    import meal_planner
+
+    stats = meal_planner.meal_batcher.stats
+    before = dict(stats)
+    timings, valid = [], 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for latency, ok in await burst(concurrency):
+            timings.append(latency)
+            valid += ok
+    elapsed = time.perf_counter() - start
+    if meal_planner.MEAL_BATCHING_ENABLED:
+        calls = sum(stats[key] - before[key] for key in ("batches", "singles", "fallbacks"))
+    else:
+        calls = len(timings)
+    timings.sort()
+    print(f"{label:<26} {statistics.median(timings):>7.2f} {timings[int(0.95 * (len(timings) - 1))]:>7.2f} "
+          f"{elapsed:>8.2f} {calls:>6} {valid / len(timings):>7.0%}")
+
+
+async def main(args):
+    import meal_planner
+    from batching import MicroBatcher
+
+    print(f"{'configuration':<26} {'p50 s':>7} {'p95 s':>7} {'total s':>8} {'calls':>6} {'valid':>7}")
+    meal_planner.MEAL_BATCHING_ENABLED = False
+    await run("unbatched", args.concurrency, args.rounds)
+
+    meal_planner.MEAL_BATCHING_ENABLED = True
+    for max_in_flight in args.in_flight:
+        for window in args.windows:
+            for size in args.sizes:
+                meal_planner.meal_batcher = MicroBatcher("meal", meal_planner.generate_meals_batch,
+                                                         meal_planner.generate_single_meal, window=window / 1000,
+                                                         max_size=size, max_in_flight=max_in_flight)
+                await run(f"window={window}ms size={size} if={max_in_flight}", args.concurrency, args.rounds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--windows", type=int, nargs="+", default=[50, 100, 200])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--in-flight", type=int, nargs="+", default=[1],
+                        help="MEAL_BATCH_MAX_IN_FLIGHT values, 0 always waits for the window")
+    args = parser.parse_args()
+
+    os.environ["MEAL_PLANNER_SEMANTIC_CACHE_ENABLED"] = "false"
+    asyncio.run(main(args))
@@ -0,0 +1,97 @@
+"""Latency and output validity of each task's model profile.
+
+    python benchmarks/model_profiles.py --runs 10
+    python benchmarks/model_profiles.py --profile '{"meal": {"num_predict": 128}}'
+
+Runs the real generators against OLLAMA_URL (point it at benchmarks/fake_ollama.py
+with MEAL_PLANNER_OLLAMA_URL to run offline) with the semantic cache disabled. "first pass" is the share of generations that
+matched their schema without local repair or a retry; "valid" is what the user got.
+--profile is merged into MODEL_PROFILES the same way MEAL_PLANNER_MODEL_PROFILES is.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MEAL_INPUTS = [
+    ("chicken breast\nbroccoli", ""),
+    ("lentils, spinach", "Mon: Chicken and Broccoli Stir-Fry"),
+    ("salmon", "Mon: Chicken and Broccoli Stir-Fry, Tue: Lentil Curry"),
+    ("ground beef\nblack beans\ncorn", "Wed: Miso Salmon"),
+]
+WEEK = """Mon: Chicken and Broccoli Stir-Fry
+Ingredients: chicken breast
+broccoli
+soy sauce
+garlic
+rice
+
+Tue: Lentil Curry
+Ingredients: lentils
+spinach
+coconut milk
+curry powder
+onion
+
+Thu: Beef Tacos
+Ingredients: ground beef
+black beans
+corn tortillas
+salsa
+cheddar"""
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(round(q / 100 * (len(samples) - 1))))]
+
+
+async def run_task(task, runs):
+    from meal_planner import FALLBACK_INGREDIENTS, generate_ingredients, generate_meal, generate_shopping_list
+
+    timings, valid = [], 0
+    for run in range(runs):
+        start = time.perf_counter()
+        if task == "ingredients":
+            result = await generate_ingredients()
+            ok = result != FALLBACK_INGREDIENTS
+        elif task == "meal":
+            result = await generate_meal(*MEAL_INPUTS[run % len(MEAL_INPUTS)])
+            ok = not result['title'].startswith(("Invalid response format", "Error", "HTTP error", "Unexpected error"))
+        else:
+            result = await generate_shopping_list(WEEK)
+            ok = bool(result) and result[0]['item'] != "Error generating shopping list"
+        timings.append(time.perf_counter() - start)
+        valid += ok
+    return timings, valid
+
+
+async def main(tasks, runs):
+    from config import MODEL_PROFILES, OLLAMA_MODEL
+    from schemas import validity_report
+
+    print(f"{'task':<14} {'model':<14} {'num_predict':>11} {'p50 s':>7} {'p95 s':>7} {'first pass':>10} {'valid':>7}")
+    for task in tasks:
+        profile = MODEL_PROFILES[task]
+        timings, valid = await run_task(task, runs)
+        first_pass = validity_report()[task]["first_pass_rate"] or 0.0
+        print(f"{task:<14} {profile.get('model') or OLLAMA_MODEL:<14} {profile.get('num_predict', '-'):>11} "
+              f"{statistics.median(timings):>7.2f} {percentile(timings, 95):>7.2f} {first_pass:>10.0%} {valid / runs:>7.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--tasks", nargs="+", default=["ingredients", "meal", "shopping_list"])
+    parser.add_argument("--profile", help="JSON merged into MODEL_PROFILES")
+    args = parser.parse_args()
+
+    # Settings are read from the environment when config is first imported
+    os.environ["MEAL_PLANNER_SEMANTIC_CACHE_ENABLED"] = "false"
+    if args.profile:
+        os.environ["MEAL_PLANNER_MODEL_PROFILES"] = args.profile
+    asyncio.run(main(args.tasks, args.runs))
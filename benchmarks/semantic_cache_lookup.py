@@ -0,0 +1,72 @@
+"""Lookup latency of SemanticCache at increasing sizes.
+
+    python benchmarks/semantic_cache_lookup.py --sizes 10000 100000 1000000 --dim 768
+
+The store is filled with random unit vectors directly (no Ollama needed) and queried
+both one at a time and in batches.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from semantic_cache import SemanticCache
+
+
+def random_unit_vectors(rng, n, dim):
+    vectors = rng.standard_normal((n, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def fill(cache, rng, size, dim, chunk=100000):
+    cache._open(dim)
+    for start in range(0, size, chunk):
+        stop = min(start + chunk, size)
+        cache._vectors[start:stop] = random_unit_vectors(rng, stop - start, dim)
+    cache._values = [{"row": row} for row in range(size)]
+    cache._size = size
+
+
+def percentile_ms(samples, q):
+    return np.percentile(samples, q) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=64)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'entries':>10} {'p50 ms':>9} {'p99 ms':>9} {'batch/query ms':>15}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            cache = SemanticCache("bench", capacity=size, directory=directory)
+            fill(cache, rng, size, args.dim)
+            queries = random_unit_vectors(rng, args.queries, args.dim)
+
+            cache.lookup(queries[0])  # warm the page cache
+            timings = []
+            for query in queries:
+                start = time.perf_counter()
+                cache.lookup(query)
+                timings.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for offset in range(0, len(queries), args.batch):
+                cache.search(queries[offset:offset + args.batch])
+            batched = (time.perf_counter() - start) / len(queries)
+
+            print(f"{size:>10} {percentile_ms(timings, 50):>9.3f} {percentile_ms(timings, 99):>9.3f} {batched * 1000:>15.3f}")
+            del cache
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Time to first streamed shopping-list item vs. time to the full list, by list length.
+
+    python benchmarks/fake_ollama.py &
+    MEAL_PLANNER_OLLAMA_URL=http://localhost:11435/api/generate \\
+        python benchmarks/shopping_list_stream.py --items 10 40 80
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def week_with(items):
+    days = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+    blocks = {}
+    for n in range(items):
+        blocks.setdefault(days[n % len(days)], []).append(f"ingredient {n}")
+    return "\n\n".join(f"{day}: Dinner\nIngredients: " + "\n".join(ingredients) for day, ingredients in blocks.items())
+
+
+async def measure(items):
+    from meal_planner import generate_shopping_list
+
+    start = time.perf_counter()
+    first = None
+
+    def on_items(streamed):
+        nonlocal first
+        if first is None:
+            first = time.perf_counter() - start
+
+    shopping_list = await generate_shopping_list(week_with(items), on_items)
+    return first, time.perf_counter() - start, len(shopping_list)
+
+
+async def main(sizes):
+    print(f"{'items':>6} {'first item s':>13} {'full list s':>12} {'received':>9}")
+    for items in sizes:
+        first, total, received = await measure(items)
+        print(f"{items:>6} {first if first is not None else float('nan'):>13.2f} {total:>12.2f} {received:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, nargs="+", default=[10, 40, 80])
+    args = parser.parse_args()
+
+    os.environ["MEAL_PLANNER_SEMANTIC_CACHE_ENABLED"] = "false"
+    asyncio.run(main(args.items))
@@ -0,0 +1,53 @@
+"""Cold import and app-creation time, each measured in a fresh interpreter.
+
+    python benchmarks/startup.py --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STAGES = {
+    "interpreter": "pass",
+    "import config": "import config",
+    "import meal_planner": "import meal_planner",
+    "create_app()": "import meal_planner; meal_planner.create_app()",
+}
+
+TIMER = """
+import time
+start = time.perf_counter()
+{code}
+print(time.perf_counter() - start)
+"""
+
+
+def measure(code, runs, cwd):
+    env = {**os.environ, "PYTHONPATH": REPO}
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", TIMER.format(code=code)], cwd=cwd, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'stage':<22} {'median ms':>10} {'min ms':>8}")
+    # Run from a scratch directory so log files do not land in the repo
+    with tempfile.TemporaryDirectory() as cwd:
+        for stage, code in STAGES.items():
+            timings = measure(code, args.runs, cwd)
+            print(f"{stage:<22} {statistics.median(timings) * 1000:>10.1f} {min(timings) * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,19 @@ OLLAMA_URL = "http://localhost:11434/api/generate"
 OLLAMA_MODEL = "llama3.2"
 OLLAMA_TIMEOUT = 30.0
 
+# Per-task model and generation options. "model": None means OLLAMA_MODEL, as does a model
+# that has not been pulled, after a warning. The simple ingredients task uses a small fast model.
+# num_predict caps output tokens so a runaway completion cannot use the whole timeout,
+# and num_ctx is sized to each task's prompt plus output.
+MODEL_PROFILES = {
+    "ingredients": {"model": "llama3.2:1b", "num_predict": 160, "num_ctx": 1024, "temperature": 0.9},
+    "meal": {"model": None, "num_predict": 256, "num_ctx": 2048, "temperature": 0.7},
+    "shopping_list": {"model": None, "num_predict": 1536, "num_ctx": 4096, "temperature": 0.2},
+}
+
+# Extra generations allowed when a response fails schema validation and cannot be repaired
+SCHEMA_MAX_RETRIES = 1
+
 # Logging Configuration
 LOG_FILE = "meal_planner.log"
 LOG_MAX_BYTES = 10000
@@ -12,4 +25,80 @@ LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
 
 # File Export Configuration
 EXPORT_DATE_FORMAT = "%Y%m%d_%H%M%S"
-EXPORT_FILENAME_PREFIX = "shopping_list" 
\ No newline at end of file
+EXPORT_FILENAME_PREFIX = "shopping_list" 
+
+# Semantic Cache Configuration
+SEMANTIC_CACHE_ENABLED = True
+OLLAMA_EMBED_URL = "http://localhost:11434/api/embeddings"
+OLLAMA_EMBED_MODEL = "nomic-embed-text"
+SEMANTIC_CACHE_DIR = "semantic_cache"
+SEMANTIC_CACHE_CAPACITY = 10000
+SEMANTIC_CACHE_THRESHOLD = 0.97
+# Caches that also require the same normalized request, as a shopping list for a week with one more
+# ingredient or a meal on another day still embeds above the threshold
+SEMANTIC_CACHE_EXACT = ["shopping_lists"]
+
+# Batch Planning Configuration
+BATCH_CONCURRENCY = 4
+
+# Meal Batching Configuration
+# Concurrent /generate/{day} requests can share one multi-meal prompt. A batch is sent once
+# MEAL_BATCH_MAX_SIZE requests wait, after MEAL_BATCH_WINDOW_MS, or at once while fewer than
+# MEAL_BATCH_MAX_IN_FLIGHT batches are running (0 always waits for the window or a full batch).
+MEAL_BATCHING_ENABLED = False
+MEAL_BATCH_WINDOW_MS = 100
+MEAL_BATCH_MAX_SIZE = 4
+MEAL_BATCH_MAX_IN_FLIGHT = 1
+
+# Background Job Configuration
+JOB_WORKERS = 2
+JOB_QUEUE_SIZE = 100
+JOB_DIR = "jobs"
+JOB_RESULT_TTL = 86400  # Seconds finished job results are kept for re-download
+JOB_STALE_AFTER = 300  # Seconds without a heartbeat after which an unfinished job from another process is reported as lost
+JOB_HEARTBEAT_INTERVAL = 30  # Seconds between re-saves of unfinished jobs, must be well under JOB_STALE_AFTER
+JOB_METRICS_WINDOW = 200  # Recent jobs used for latency percentiles
+JOB_POLL_INTERVAL = "500ms"  # Also how often streamed shopping-list items are shown
+
+# Diagnostics Configuration
+LOOP_MONITOR_ENABLED = True
+LOOP_MONITOR_INTERVAL = 0.1  # Seconds between event-loop heartbeats
+LOOP_STALL_THRESHOLD = 0.25  # Seconds a heartbeat may be late before it is recorded as a stall
+LOOP_STALL_HISTORY = 50  # Recent stalls kept, with their stacks, for /debug/stalls
+DEBUG_PROFILE_TOKEN = ""  # The /debug endpoints return 404 unless this is set and sent in an X-Debug-Token header
+PROFILE_SAMPLE_INTERVAL = 0.005
+PROFILE_MAX_SECONDS = 60
+
+# Server Configuration
+HOST = "0.0.0.0"
+PORT = 5001
+WORKERS = 1
+RELOAD = True
+
+# Environment Overrides
+# Every setting above can be overridden with a MEAL_PLANNER_<NAME> environment variable,
+# e.g. MEAL_PLANNER_OLLAMA_MODEL=llama3.1 or MEAL_PLANNER_WORKERS=4. Keep new settings above this block.
+def _apply_env_overrides(settings, prefix="MEAL_PLANNER_"):
+    import json
+    import os
+
+    for name, default in list(settings.items()):
+        raw = os.environ.get(prefix + name)
+        if not name.isupper() or raw is None:
+            continue
+        if isinstance(default, bool):
+            settings[name] = raw.strip().lower() in ("1", "true", "yes", "on")
+        elif isinstance(default, (int, float)):
+            settings[name] = type(default)(raw)
+        elif isinstance(default, dict):
+            # Merged one level deep, so a single entry can be overridden with partial JSON
+            overrides = json.loads(raw)
+            settings[name] = {key: {**value, **overrides.pop(key, {})} if isinstance(value, dict) else overrides.pop(key, value)
+                              for key, value in default.items()}
+            settings[name].update(overrides)
+        elif isinstance(default, (list, tuple)):
+            settings[name] = type(default)(json.loads(raw))
+        else:
+            settings[name] = raw
+
+_apply_env_overrides(globals())
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+
+from config import *  # Import configuration values
+
+logger = logging.getLogger("meal_planner.diagnostics")
+
+
+class LoopLagMonitor:
+    """Measures how late a periodic heartbeat on the event loop wakes up.
+
+    A watchdog thread notices when the heartbeat is overdue by more than `threshold`
+    while the loop is still blocked, and captures the loop thread's stack at that
+    moment, so each recorded stall says what was running instead of the heartbeat."""
+
+    def __init__(self, interval=LOOP_MONITOR_INTERVAL, threshold=LOOP_STALL_THRESHOLD, history=LOOP_STALL_HISTORY):
+        self.interval = interval
+        self.threshold = threshold
+        self.stalls = deque(maxlen=history)
+        self.stall_count = 0
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+        self.last_beat = None
+        self.loop_thread = None
+        self.stall_stack = None
+        self.task = None
+        self.watchdog = None
+        self.stopped = threading.Event()
+
+    async def start(self):
+        if not LOOP_MONITOR_ENABLED or self.task is not None:
+            return
+        self.loop_thread = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self.stopped.clear()
+        self.task = asyncio.create_task(self.heartbeat())
+        self.watchdog = threading.Thread(target=self.watch, name="loop-lag-watchdog", daemon=True)
+        self.watchdog.start()
+        logger.info(f"Event loop monitor started, recording stalls over {self.threshold * 1000:.0f}ms")
+
+    async def stop(self):
+        self.stopped.set()
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.threshold:
+                self.record_stall(lag)
+            self.last_beat = now
+            self.stall_stack = None
+
+    def watch(self):
+        while not self.stopped.wait(self.threshold / 2):
+            overdue = time.monotonic() - self.last_beat - self.interval
+            if overdue >= self.threshold and self.stall_stack is None:
+                frame = sys._current_frames().get(self.loop_thread)
+                if frame is not None:
+                    self.stall_stack = "".join(traceback.format_stack(frame))
+
+    def record_stall(self, lag):
+        self.stall_count += 1
+        stack = self.stall_stack or "Stack not captured, the stall ended before the watchdog checked"
+        self.stalls.append({"at": time.time(), "lag_ms": round(lag * 1000, 1), "stack": stack})
+        logger.warning(f"Event loop blocked for {lag * 1000:.0f}ms in:\n{stack}")
+
+    def metrics(self):
+        return {
+            "running": self.task is not None,
+            "last_lag_ms": round(self.last_lag * 1000, 1),
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "stalls": self.stall_count,
+            "threshold_ms": self.threshold * 1000,
+        }
+
+
+def frame_name(frame):
+    return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}"
+
+
+def sample_stacks(seconds, interval=PROFILE_SAMPLE_INTERVAL):
+    """Samples every other thread's stack for `seconds`; returns a Counter of collapsed stacks."""
+    counts = Counter()
+    thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+    sampler = threading.get_ident()
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == sampler:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame_name(frame))
+                frame = frame.f_back
+            stack.append(thread_names.get(thread_id, f"thread-{thread_id}"))
+            counts[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    return counts
+
+
+def collapsed(counts):
+    # One "frame;frame;frame count" line per stack, the input format of flamegraph.pl and speedscope
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
@@ -0,0 +1,239 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import deque
+
+from config import *  # Import configuration values
+
+logger = logging.getLogger("meal_planner.jobs")
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, payload, job_id=None):
+        self.id = job_id or uuid.uuid4().hex
+        self.payload = payload
+        self.status = "queued"
+        self.result = None
+        self.partial = []
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.updated = self.created
+
+    @property
+    def pending(self):
+        return self.status in ("queued", "running")
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in ("id", "status", "result", "partial", "error", "created", "started", "finished", "updated")}
+
+    @classmethod
+    def from_dict(cls, data):
+        job = cls(None, data["id"])
+        for key in ("status", "result", "error", "created", "started", "finished"):
+            setattr(job, key, data.get(key))
+        job.partial = data.get("partial") or []
+        job.updated = data.get("updated") or job.created
+        return job
+
+
+class JobQueue:
+    """Runs `handler(job)` for submitted jobs on a fixed pool of asyncio workers. Handlers
+    read `job.payload` and may publish intermediate results with `publish(job, partial)`.
+
+    Job state is also written to `<directory>/<id>.json` when a job is queued, starts and
+    finishes, so results can be fetched again later, from any worker process, until
+    JOB_RESULT_TTL. Unfinished jobs are re-saved every JOB_HEARTBEAT_INTERVAL, so other
+    processes can tell a job whose process has gone away from one that is still waiting, and
+    expired results are removed at the same interval."""
+
+    def __init__(self, name, handler, workers=JOB_WORKERS, max_queued=JOB_QUEUE_SIZE, directory=JOB_DIR):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.directory = os.path.join(directory, name)
+        self.queue = asyncio.Queue(maxsize=max_queued)
+        self.jobs = {}
+        self.tasks = []
+        self.heartbeat_task = None
+        self.save_lock = asyncio.Lock()
+        self.unpublished = set()
+        self.saves = set()
+        self.running = 0
+        self.busy_seconds = 0.0
+        self.started_at = None
+        self.completed = 0
+        self.failed = 0
+        self.wait_times = deque(maxlen=JOB_METRICS_WINDOW)
+        self.run_times = deque(maxlen=JOB_METRICS_WINDOW)
+
+    async def start(self):
+        if self.tasks:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self.remove_expired()
+        self.started_at = time.monotonic()
+        self.tasks = [asyncio.create_task(self.worker()) for _ in range(self.workers)]
+        self.heartbeat_task = asyncio.create_task(self.heartbeat())
+        logger.info(f"Started {self.workers} {self.name} workers")
+
+    async def stop(self):
+        tasks = self.tasks + ([self.heartbeat_task] if self.heartbeat_task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.tasks = []
+        self.heartbeat_task = None
+
+    def submit(self, payload):
+        job = Job(payload)
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFull(f"{self.queue.qsize()} {self.name} jobs already queued")
+        self.jobs[job.id] = job
+        try:
+            self.save(job)
+        except OSError as e:
+            # Still runs; only polls that reach another process will not find it
+            logger.error(f"Could not save {self.name} job {job.id}: {str(e)}")
+        logger.info(f"Queued {self.name} job {job.id}, queue depth {self.queue.qsize()}")
+        return job
+
+    def get(self, job_id):
+        if job_id in self.jobs:
+            return self.jobs[job_id]
+        # Submitted to another worker process, or before a restart
+        try:
+            with open(self.path(job_id)) as f:
+                job = Job.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError):
+            return None
+        if job.pending and time.time() - job.updated > JOB_STALE_AFTER:
+            # Its process went away before finishing it
+            job.status = "failed"
+            job.error = "Job was interrupted, please try again"
+        return job
+
+    async def worker(self):
+        while True:
+            job = await self.queue.get()
+            job.status = "running"
+            job.started = time.time()
+            self.running += 1
+            start = time.monotonic()
+            try:
+                await self.persist(job)
+                job.result = await self.handler(job)
+                job.status = "done"
+                self.completed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"{self.name} job {job.id} failed: {str(e)}")
+                job.status = "failed"
+                job.error = str(e)
+                self.failed += 1
+            finally:
+                self.running -= 1
+                self.busy_seconds += time.monotonic() - start
+                job.finished = time.time()
+                self.wait_times.append(job.started - job.created)
+                self.run_times.append(job.finished - job.started)
+                self.queue.task_done()
+            await self.persist(job)
+            self.forget_finished()
+
+    async def heartbeat(self):
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_INTERVAL)
+            for job in [job for job in self.jobs.values() if job.pending]:
+                await self.persist(job)
+            self.forget_expired()
+            try:
+                await asyncio.to_thread(self.remove_expired)
+            except OSError as e:
+                logger.error(f"Could not remove expired {self.name} jobs: {str(e)}")
+
+    def publish(self, job, partial):
+        # Saved as well, so polls that reach another worker process see the same progress.
+        # At most one save per job waits for the lock, and it writes whatever is newest when it runs
+        job.partial = partial
+        if job.id in self.unpublished:
+            return
+        self.unpublished.add(job.id)
+        task = asyncio.create_task(self.persist(job))
+        self.saves.add(task)
+        task.add_done_callback(self.saves.discard)
+
+    async def persist(self, job):
+        # Saved off the event loop, one at a time so an older state never overwrites a newer one.
+        # Errors are logged rather than raised, a worker must not die because the disk is full
+        async with self.save_lock:
+            self.unpublished.discard(job.id)
+            try:
+                await asyncio.to_thread(self.save, job)
+            except OSError as e:
+                logger.error(f"Could not save {self.name} job {job.id}: {str(e)}")
+
+    def path(self, job_id):
+        # Ids are uuid hex, anything else cannot name a job file
+        if not job_id.isalnum():
+            raise ValueError(f"Invalid job id: {job_id!r}")
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def save(self, job):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(job.id)
+        job.updated = time.time()
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(job.to_dict(), f)
+        os.replace(f"{path}.tmp", path)
+
+    def forget_finished(self):
+        # Finished jobs stay on disk; only the most recent are kept in memory
+        finished = [job_id for job_id, job in self.jobs.items() if not job.pending]
+        for job_id in finished[:max(0, len(finished) - JOB_METRICS_WINDOW)]:
+            del self.jobs[job_id]
+
+    def forget_expired(self):
+        cutoff = time.time() - JOB_RESULT_TTL
+        for job_id in [job_id for job_id, job in self.jobs.items() if not job.pending and job.finished < cutoff]:
+            del self.jobs[job_id]
+
+    def remove_expired(self):
+        cutoff = time.time() - JOB_RESULT_TTL
+        for filename in os.listdir(self.directory):
+            path = os.path.join(self.directory, filename)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                continue
+
+    def metrics(self):
+        def percentiles(samples):
+            samples = sorted(samples)
+            if not samples:
+                return {"p50": None, "p95": None}
+            return {q: samples[min(len(samples) - 1, int(p * len(samples)))] for q, p in (("p50", 0.5), ("p95", 0.95))}
+
+        uptime = time.monotonic() - self.started_at if self.started_at else 0.0
+        return {
+            "queue_depth": self.queue.qsize(),
+            "running": self.running,
+            "workers": len(self.tasks),
+            "completed": self.completed,
+            "failed": self.failed,
+            "wait_seconds": percentiles(self.wait_times),
+            "run_seconds": percentiles(self.run_times),
+            "utilization": self.busy_seconds / (uptime * self.workers) if uptime else 0.0,
+        }
@@ -0,0 +1,45 @@
+import json
+
+
+class ArrayItemParser:
+    """Incremental parser for streamed JSON text that returns each object inside an array
+    as soon as its closing brace arrives, e.g. the entries of {"shopping_list": [...]}.
+
+    Only strings and nesting are tracked, so feeding is a single pass over each chunk."""
+
+    def __init__(self):
+        self.stack = []
+        self.in_string = False
+        self.escaped = False
+        self.item = None
+        self.item_depth = None
+
+    def feed(self, chunk):
+        items = []
+        for char in chunk:
+            if self.item is not None:
+                self.item.append(char)
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in '{[':
+                if char == '{' and self.item is None and self.stack and self.stack[-1] == '[':
+                    self.item = [char]
+                    self.item_depth = len(self.stack)
+                self.stack.append(char)
+            elif char in '}]':
+                if self.stack:
+                    self.stack.pop()
+                if self.item is not None and len(self.stack) == self.item_depth:
+                    try:
+                        items.append(json.loads("".join(self.item)))
+                    except json.JSONDecodeError:
+                        pass
+                    self.item = None
+        return items
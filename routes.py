@@ -0,0 +1,708 @@
+import asyncio
+import csv
+import hmac
+import io
+import logging
+import math
+from datetime import datetime
+
+from fasthtml.common import *
+
+from config import *  # Import configuration values
+from meal_planner import generate_ingredients, generate_meal, generate_shopping_list, meal_batcher
+from diagnostics import LoopLagMonitor, collapsed, sample_stacks
+from jobs import JobQueue, QueueFull
+from schemas import validity_report
+
+logger = logging.getLogger("meal_planner.routes")
+WEEK_DAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+ar = APIRouter()
+
+def shopping_list_csv(shopping_list):
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['Item', 'Meals'])
+    for item in shopping_list:
+        writer.writerow([item['item'], ', '.join(item['meals'])])
+    return output.getvalue()
+
+def save_shopping_list(shopping_list):
+    timestamp = datetime.now().strftime(EXPORT_DATE_FORMAT)
+    filename = f"{EXPORT_FILENAME_PREFIX}_{timestamp}.csv"
+    with open(filename, 'w', newline='') as csvfile:
+        csvfile.write(shopping_list_csv(shopping_list))
+    return filename
+
+async def run_shopping_list_job(job):
+    def show_progress(items):
+        shopping_list_jobs.publish(job, items)
+
+    shopping_list = await generate_shopping_list(job.payload["meals_and_ingredients"], show_progress,
+                                                 regenerate=job.payload["regenerate"])
+    filename = None
+    if shopping_list:
+        # Written off the event loop so other requests are not held up by disk I/O
+        filename = await asyncio.to_thread(save_shopping_list, shopping_list)
+        logger.info(f"Shopping list saved to {filename}")
+    return {"shopping_list": shopping_list, "filename": filename}
+
+shopping_list_jobs = JobQueue("shopping_lists", run_shopping_list_job)
+loop_monitor = LoopLagMonitor()
+profile_lock = asyncio.Lock()
+
+def shopping_list_item(item):
+    return Li(
+        Span(f"{item['item']} - {', '.join(item['meals'])}"),
+        Button("×", cls="remove-item-btn", onclick="removeShoppingItem(event)"),
+        cls="shopping-list-item"
+    )
+
+def shopping_list_job_placeholder(job):
+    # Replaces itself on every poll until the job has finished, showing the items streamed so far
+    if job.status == "queued" and job.id in shopping_list_jobs.jobs:
+        status = f"Waiting to generate shopping list... ({shopping_list_jobs.queue.qsize()} in queue)"
+    elif job.status == "queued":
+        # Queued in another worker process, whose queue depth is not known here
+        status = "Waiting to generate shopping list..."
+    else:
+        status = "Generating shopping list..."
+    return Div(
+        Ul(*[shopping_list_item(item) for item in job.partial],
+           Li(status, cls="shopping-list-item"),
+           cls="shopping-list"),
+        hx_get=f"/shopping_list_jobs/{job.id}",
+        hx_trigger=f"load delay:{JOB_POLL_INTERVAL}",
+        hx_swap="outerHTML"
+    )
+
+def generate_wiggle_animation(duration=5000, max_rotation=200):
+    frames = []
+    for t in range(0, duration, 50):  # 50ms intervals
+        progress = t / duration
+        rotation = math.sin(t / 50) * (max_rotation - progress * max_rotation)
+        frames.append(f"{t}ms {{ transform: rotate({rotation}deg); }}")
+    
+    return "\n".join(frames)
+
+def wiggle_button(button_id):
+    animation_name = f"wiggle_{button_id}"
+    keyframes = generate_wiggle_animation()
+    
+    return [
+        Style(f"""
+            @keyframes {animation_name} {{
+                {keyframes}
+            }}
+            #{button_id} {{
+                animation: {animation_name} 2s ease-in-out;
+            }}
+        """),
+        Script(f"""
+            document.getElementById('{button_id}').addEventListener('animationend', function() {{
+                this.style.animation = '';
+            }});
+        """)
+    ]
+
+@ar("/")
+def get():
+    logger.info("Rendering initial page")
+    days = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+    
+    day_cards = [
+        Div(
+            H3(day, cls="day-title"),
+            Div(
+                Input(placeholder="Dinner", name=f"{day.lower()}_dinner", id=f"{day.lower()}_dinner", value=""),
+                Textarea(placeholder="Ingredients", name=f"{day.lower()}_ingredients", id=f"{day.lower()}_ingredients", value=""),
+                Div(
+                    Button("Generate", 
+                           hx_post=f"/generate/{day.lower()}", 
+                           hx_target=f"#{day.lower()}_card",
+                           hx_include=f"#{day.lower()}_dinner,#{day.lower()}_ingredients,.meal-grid input"),
+                    Span(cls="loading-spinner"),
+                    cls="button-container"
+                ),
+                cls="card-content"
+            ),
+            cls="day-card",
+            id=f"{day.lower()}_card",
+            ondragover="event.preventDefault();",
+            ondrop=f"drop(event, '{day.lower()}')"
+        ) for day in days
+    ]
+    
+    ingredient_list = Div(
+        H2("Primary Ingredients", cls="ingredient-title"),
+        Ul(id="ingredient-list", cls="ingredient-list"),
+        Div(
+            Button("Generate Ingredients", 
+                   hx_post="/generate_ingredients", 
+                   hx_target="#ingredient-list",
+                   cls="generate-ingredients-btn"),
+            Span(cls="loading-spinner"),
+            cls="button-container"
+        ),
+        cls="ingredient-section"
+    )
+    
+    shopping_list_section = Div(
+        H2("Shopping List", cls="shopping-list-title"),
+        Div(
+            Button("Generate Shopping List", 
+                   hx_post="/generate_shopping_list", 
+                   hx_target="#shopping-list",
+                   hx_include=".meal-grid input, .meal-grid textarea",
+                   cls="generate-shopping-list-btn"),
+            Span(cls="loading-spinner"),
+            cls="button-container"
+        ),
+        Ul(id="shopping-list", cls="shopping-list"),
+        cls="shopping-list-section"
+    )
+    
+    content = Div(
+        H1("Weekly Dinner Planner", cls="main-title"),
+        ingredient_list,
+        Div(*day_cards, cls="meal-grid"),
+        shopping_list_section,
+        cls="container"
+    )
+    
+    styles = Style("""
+        @import url('https://fonts.googleapis.com/css2?family=VT323&display=swap');
+
+        body {
+            background: linear-gradient(45deg, #ff6ad5, #c774e8, #ad8cff, #8795e8, #94d0ff);
+            background-size: 400% 400%;
+            animation: gradient 15s ease infinite;
+            color: #ecf0f1;
+            font-family: 'VT323', monospace;
+            margin: 0;
+            padding: 0;
+        }
+
+        @keyframes gradient {
+            0% { background-position: 0% 50%; }
+            50% { background-position: 100% 50%; }
+            100% { background-position: 0% 50%; }
+        }
+
+        .container {
+            max-width: 1200px;
+            margin: 0 auto;
+            padding: 2rem;
+        }
+
+        .main-title {
+            font-size: 4rem;
+            text-align: center;
+            color: #00ffff;
+            text-shadow: 3px 3px #ff00ff;
+            margin-bottom: 2rem;
+        }
+
+        .ingredient-section {
+            background: rgba(0, 0, 0, 0.3);
+            border-radius: 16px;
+            padding: 1rem;
+            margin-bottom: 2rem;
+            box-shadow: 0 4px 30px rgba(0, 0, 0, 0.1);
+        }
+
+        .ingredient-title {
+            font-size: 2rem;
+            color: #00ffff;
+            margin-bottom: 1rem;
+            text-shadow: 2px 2px #ff00ff;
+        }
+
+        .ingredient-list {
+            display: flex;
+            flex-wrap: wrap;
+            gap: 0.75rem;
+            list-style-type: none;
+            padding: 0;
+        }
+
+        .ingredient-item {
+            background: rgba(255, 255, 255, 0.2);
+            padding: 0.5rem 1rem;
+            border-radius: 20px;
+            cursor: move;
+            font-size: 1.2rem;
+            color: #ffffff;
+            text-shadow: 1px 1px #ff00ff;
+            transition: all 0.3s ease;
+        }
+
+        .ingredient-item:hover {
+            background: rgba(255, 255, 255, 0.3);
+            transform: scale(1.05);
+        }
+
+        .generate-ingredients-btn {
+            margin-top: 1rem;
+        }
+
+        .meal-grid {
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(250px, 1fr));
+            gap: 1.5rem;
+        }
+
+        .day-card {
+            background: rgba(0, 0, 0, 0.3);
+            border-radius: 16px;
+            box-shadow: 0 4px 30px rgba(0, 0, 0, 0.1);
+            backdrop-filter: blur(5px);
+            border: 1px solid rgba(255, 255, 255, 0.3);
+            overflow: hidden;
+            transition: transform 0.3s ease;
+        }
+
+        .day-card:hover {
+            transform: translateY(-5px);
+        }
+
+        .day-title {
+            font-size: 2rem;
+            margin: 0;
+            padding: 1rem;
+            background: rgba(0, 255, 255, 0.3);
+            color: #ffffff;
+            text-align: center;
+            text-shadow: 2px 2px #ff00ff;
+        }
+
+        .card-content {
+            padding: 1rem;
+        }
+
+        input, textarea {
+            width: 100%;
+            padding: 0.5rem;
+            margin-bottom: 0.5rem;
+            border: none;
+            border-radius: 4px;
+            background-color: rgba(255, 255, 255, 0.2);
+            color: #ffffff;
+            font-family: 'VT323', monospace;
+            font-size: 1rem;
+        }
+
+        textarea {
+            height: 80px;
+            resize: vertical;
+        }
+
+        button {
+            width: 100%;
+            padding: 0.5rem;
+            background-color: #ff00ff;
+            color: #ffffff;
+            border: none;
+            border-radius: 4px;
+            cursor: pointer;
+            font-family: 'VT323', monospace;
+            font-size: 1rem;
+            transition: background-color 0.3s ease;
+        }
+
+        button:hover {
+            background-color: #00ffff;
+            color: #000000;
+        }
+
+        @media (max-width: 768px) {
+            .meal-grid {
+                grid-template-columns: 1fr;
+            }
+        }
+
+        .shopping-list-section {
+            background: rgba(0, 0, 0, 0.3);
+            border-radius: 16px;
+            padding: 1rem;
+            margin-top: 2rem;
+            box-shadow: 0 4px 30px rgba(0, 0, 0, 0.1);
+        }
+
+        .shopping-list-title {
+            font-size: 2rem;
+            color: #00ffff;
+            margin-bottom: 1rem;
+            text-shadow: 2px 2px #ff00ff;
+        }
+
+        .shopping-list {
+            list-style-type: none;
+            padding: 0;
+            max-width: 600px;
+            margin: 0 auto;
+        }
+
+        .shopping-list-item {
+            background: rgba(255, 255, 255, 0.2);
+            padding: 0.75rem 1rem;
+            margin-bottom: 0.5rem;
+            border-radius: 10px;
+            display: flex;
+            justify-content: space-between;
+            align-items: center;
+            font-size: 1.1rem;
+        }
+
+        .shopping-list-item span {
+            flex-grow: 1;
+            margin-right: 1rem;
+            word-break: break-word;
+        }
+
+        .remove-item-btn {
+            background: none;
+            border: none;
+            color: #ff00ff;
+            cursor: pointer;
+            font-size: 1.2rem;
+            padding: 0;
+            width: 24px;
+            height: 24px;
+            line-height: 24px;
+            text-align: center;
+            flex-shrink: 0;
+        }
+
+        .remove-item-btn:hover {
+            color: #00ffff;
+        }
+
+        .generate-shopping-list-btn {
+            background-color: #ff00ff;
+            color: #ffffff;
+            border: none;
+            border-radius: 8px;
+            padding: 0.75rem 1.5rem;
+            font-size: 1.1rem;
+            cursor: pointer;
+            transition: background-color 0.3s ease;
+            margin-bottom: 1rem;
+        }
+
+        .generate-shopping-list-btn:hover {
+            background-color: #00ffff;
+            color: #000000;
+        }
+
+        .save-message {
+            margin-top: 1rem;
+            font-style: italic;
+            color: #00ffff;
+        }
+
+        .htmx-indicator {
+            display: none;
+        }
+        .htmx-request .htmx-indicator {
+            display: inline-block;
+        }
+        .loading-spinner {
+            display: none;
+            width: 20px;
+            height: 20px;
+            border: 3px solid rgba(255,255,255,.3);
+            border-radius: 50%;
+            border-top-color: #fff;
+            animation: spin 1s ease-in-out infinite;
+            margin-left: 10px;
+        }
+        @keyframes spin {
+            to { transform: rotate(360deg); }
+        }
+
+        .button-container {
+            display: flex;
+            align-items: center;
+        }
+
+        button {
+            transition: transform 0.3s ease;
+        }
+
+        .wiggle {
+            animation: none;
+            transition: transform 0.1s ease-in-out;
+        }
+
+        @keyframes wiggle {
+            0%, 100% { transform: rotate(0deg); }
+            25% { transform: rotate(-3deg); }
+            75% { transform: rotate(3deg); }
+        }
+
+        .export-btn {
+            background-color: #4CAF50;
+            color: white;
+            padding: 10px 20px;
+            border: none;
+            border-radius: 4px;
+            cursor: pointer;
+            font-size: 16px;
+            margin-top: 10px;
+        }
+
+        .export-btn:hover {
+            background-color: #45a049;
+        }
+    """)
+    
+    scripts = Script("""
+        function drag(event) {
+            event.dataTransfer.setData("text", event.target.innerText);
+        }
+
+        function drop(event, day) {
+            event.preventDefault();
+            var ingredient = event.dataTransfer.getData("text");
+            var textarea = document.getElementById(day + '_ingredients');
+            textarea.value += (textarea.value ? '\\n' : '') + ingredient;
+            
+            // Trigger meal generation
+            var generateBtn = event.target.closest('.day-card').querySelector('button');
+            generateBtn.click();
+        }
+
+        function removeShoppingItem(event) {
+            event.preventDefault();
+            event.target.closest('li').remove();
+        }
+
+        function wiggleButton(button) {
+            let start = null;
+            const duration = 10000;  // 10 seconds
+            const animateWiggle = (timestamp) => {
+                if (!start) start = timestamp;
+                const progress = timestamp - start;
+                const rotation = Math.sin(progress / 100) * (3 - progress / duration * 3);
+                button.style.transform = `rotate(${rotation}deg)`;
+                if (progress < duration) {
+                    requestAnimationFrame(animateWiggle);
+                } else {
+                    button.style.transform = '';
+                }
+            };
+            requestAnimationFrame(animateWiggle);
+        }
+
+        document.body.addEventListener('htmx:beforeRequest', function(event) {
+            var button = event.target.closest('button');
+            if (button) {
+                wiggleButton(button);
+            }
+        });
+
+        document.body.addEventListener('htmx:afterRequest', function(event) {
+            var button = event.target.closest('button');
+            if (button) {
+                button.style.transform = '';
+            }
+        });
+    """)
+    
+    return Titled("Weekly Dinner Planner", content, styles, scripts)
+
+@ar("/generate_ingredients")
+async def post():
+    ingredients = await generate_ingredients()
+    return Ul(*[Li(ingredient, cls="ingredient-item", draggable="true", ondragstart="drag(event)") for ingredient in ingredients], cls="ingredient-list")
+
+@ar("/generate/{day}")
+async def post(day: str, request):
+    logger.debug(f"POST request received for /generate/{day}")
+    form = await request.form()
+    logger.debug(f"Raw form data: {dict(form)}")
+
+    ingredients = form.get(f"{day}_ingredients", "").strip()
+    logger.debug(f"Extracted ingredients for {day}: {ingredients}")
+    
+    # Other meals come from the form, as with several workers the other days may have been generated by another process
+    other_meals = [f"{other.capitalize()}: {form.get(f'{other}_dinner').strip()}" for other in WEEK_DAYS
+                   if other != day and form.get(f"{other}_dinner", "").strip()]
+    other_meals_str = ", ".join(other_meals)
+    logger.debug(f"Other meals: {other_meals_str}")
+    
+    logger.info(f"Generating meal for {day} with ingredients: {ingredients}")
+    
+    try:
+        meal = await generate_meal(ingredients, other_meals_str, regenerate=bool(form.get("regenerate")))
+        logger.debug(f"Generated meal: {meal}")
+    except Exception as e:
+        logger.exception(f"Error in post function: {str(e)}")
+        meal = {"title": "Error generating meal", "ingredients": ingredients}
+    
+    button_id = f"generate_button_{day}"
+    return Div(
+        H3(day.capitalize(), cls="day-title"),
+        Div(
+            Input(value=meal['title'], name=f"{day}_dinner", id=f"{day}_dinner"),
+            Textarea(meal['ingredients'], name=f"{day}_ingredients", id=f"{day}_ingredients"),
+            Button("Generate Meal", 
+                   id=button_id,
+                   hx_post=f"/generate/{day}", 
+                   hx_target=f"#{day}_card", 
+                   hx_include=f"#{day}_dinner,#{day}_ingredients,.meal-grid input, .meal-grid textarea",
+                   hx_vals='{"regenerate": "true"}'),
+            *wiggle_button(button_id),
+            cls="card-content"
+        ),
+        cls="day-card",
+        id=f"{day}_card"
+    )
+
+# Add a new route to handle shopping list generation
+@ar("/generate_shopping_list")
+async def post(request):
+    form = await request.form()
+    logger.debug(f"Raw form data for shopping list: {dict(form)}")
+
+    meals_and_ingredients = []
+    for day in WEEK_DAYS:
+        ingredients = form.get(f"{day}_ingredients", "").strip()
+        logger.debug(f"{day.capitalize()} - Ingredients: {ingredients}")
+        if ingredients:
+            meal_title = f"{day.capitalize()}: {form.get(f'{day}_dinner', '').strip() or 'Miscellaneous'}"
+            meals_and_ingredients.append(f"{meal_title}\nIngredients: {ingredients}")
+
+    all_data_str = "\n\n".join(meals_and_ingredients)
+    logger.info(f"Collected meals and ingredients for shopping list:\n{all_data_str}")
+
+    if not all_data_str:
+        logger.warning("No meals and ingredients collected for shopping list")
+        return Ul(Li("No meals and ingredients provided. Please add meals and ingredients for the week.", cls="shopping-list-item"), id="shopping-list", cls="shopping-list")
+
+    try:
+        job = shopping_list_jobs.submit({"meals_and_ingredients": all_data_str,
+                                         "regenerate": bool(form.get("regenerate"))})
+    except QueueFull as e:
+        logger.warning(f"Shopping list queue full: {str(e)}")
+        return Ul(Li("Too many shopping lists are being generated, please try again in a moment.", cls="shopping-list-item"), id="shopping-list", cls="shopping-list")
+    return shopping_list_job_placeholder(job)
+
+@ar("/shopping_list_jobs/{job_id}")
+def get(job_id: str):
+    job = shopping_list_jobs.get(job_id)
+    if job is None:
+        return Ul(Li("Shopping list not found, please generate it again.", cls="shopping-list-item"), id="shopping-list", cls="shopping-list")
+    if job.pending:
+        return shopping_list_job_placeholder(job)
+    if job.status == "failed":
+        return Ul(Li(f"Error: {job.error}", cls="shopping-list-item"), id="shopping-list", cls="shopping-list")
+
+    shopping_list = job.result["shopping_list"]
+    if not shopping_list:
+        logger.warning("Empty shopping list generated")
+        return Ul(Li("No items in shopping list", cls="shopping-list-item"), id="shopping-list", cls="shopping-list")
+
+    return Div(
+        Ul(*[shopping_list_item(item) for item in shopping_list], id="shopping-list", cls="shopping-list"),
+        P(f"Shopping list saved to {job.result['filename']}", cls="save-message"),
+        A("Download CSV", href=f"/shopping_list_jobs/{job.id}/csv", cls="save-message"),
+        Button("Regenerate Shopping List",
+               id="regenerate_button",
+               hx_post="/generate_shopping_list",
+               hx_target="#shopping-list",
+               hx_include=".meal-grid input, .meal-grid textarea",
+               hx_vals='{"regenerate": "true"}'),
+        Button("Export Shopping List",
+               id="export_button",
+               hx_post="/export_shopping_list",
+               hx_include=".shopping-list-text",  # Update to target the span elements
+               hx_target="#export-result"),
+        Div(id="export-result")
+    )
+
+@ar("/shopping_list_jobs/{job_id}/csv")
+def get(job_id: str):
+    job = shopping_list_jobs.get(job_id)
+    if job is None or job.status != "done":
+        return Response("Shopping list not found", status_code=404)
+    return Response(content=shopping_list_csv(job.result["shopping_list"]), headers={
+        "Content-Disposition": f"attachment; filename={job.result['filename']}",
+        "Content-Type": "text/csv"
+    })
+
+@ar("/export_shopping_list")
+async def post(request):
+    form = await request.form()
+    logger.debug(f"Raw form data for export: {dict(form)}")
+    
+    # Get all the shopping list items from the form
+    shopping_list_items = form.getlist("shopping-list-item")
+
+    logger.debug(f"Shopping list items: {shopping_list_items}")
+
+    processed_list = {}
+    for item in shopping_list_items:
+        if " - " in item:
+            item_name, meals = item.split(" - ", 1)
+        else:
+            item_name, meals = item, "Unspecified"
+        
+        if item_name in processed_list:
+            processed_list[item_name]['count'] += 1
+            processed_list[item_name]['meals'] = f"{processed_list[item_name]['meals']}, {meals}"
+        else:
+            processed_list[item_name] = {'count': 1, 'meals': meals}
+
+    # Generate CSV content
+    csv_content = "Item,Quantity,Meals\n"
+    for item, details in processed_list.items():
+        csv_content += f"{item},{details['count']},{details['meals']}\n"
+
+    # Generate a new filename with timestamp
+    timestamp = datetime.now().strftime(EXPORT_DATE_FORMAT)
+    filename = f"{EXPORT_FILENAME_PREFIX}_{timestamp}.csv"
+
+    headers = {
+        "Content-Disposition": f"attachment; filename={filename}",
+        "Content-Type": "text/csv"
+    }
+    return Response(content=csv_content, headers=headers)
+
+@ar("/metrics")
+def get():
+    return JSONResponse({
+        "validation": validity_report(),
+        "shopping_list_jobs": shopping_list_jobs.metrics(),
+        "meal_batching": meal_batcher.metrics(),
+        "event_loop": loop_monitor.metrics()
+    })
+
+def debug_allowed(request):
+    # A header rather than a query parameter, which would end up in access logs
+    token = request.headers.get("X-Debug-Token", "")
+    return bool(DEBUG_PROFILE_TOKEN) and hmac.compare_digest(token.encode(), DEBUG_PROFILE_TOKEN.encode())
+
+@ar("/debug/stalls")
+def get(request):
+    if not debug_allowed(request):
+        return Response("Not Found", status_code=404)
+    return JSONResponse({"event_loop": loop_monitor.metrics(), "stalls": list(loop_monitor.stalls)})
+
+@ar("/debug/profile")
+async def get(request, seconds: float = 10):
+    if not debug_allowed(request):
+        return Response("Not Found", status_code=404)
+    if profile_lock.locked():
+        return Response("A profile is already running", status_code=409)
+    seconds = min(max(seconds, 0.1), PROFILE_MAX_SECONDS)
+    async with profile_lock:
+        logger.info(f"Profiling all threads for {seconds}s")
+        # Sampled from a separate thread, so the event loop keeps serving the traffic being profiled
+        counts = await asyncio.to_thread(sample_stacks, seconds)
+    timestamp = datetime.now().strftime(EXPORT_DATE_FORMAT)
+    return Response(content=collapsed(counts), headers={
+        "Content-Disposition": f"attachment; filename=profile_{timestamp}.folded",
+        "Content-Type": "text/plain"
+    })
@@ -0,0 +1,227 @@
+import json
+import re
+from collections import Counter
+
+# JSON schemas passed to Ollama as the "format" of each task, and validated against on return
+TASK_SCHEMAS = {
+    "ingredients": {
+        "type": "object",
+        "properties": {
+            "ingredients": {"type": "array", "items": {"type": "string"}, "minItems": 1, "maxItems": 10}
+        },
+        "required": ["ingredients"]
+    },
+    "meal": {
+        "type": "object",
+        "properties": {
+            "title": {"type": "string"},
+            "ingredients": {"type": "string"}
+        },
+        "required": ["title", "ingredients"]
+    },
+    "meal_batch": {
+        "type": "object",
+        "properties": {
+            "meals": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "id": {"type": "integer"},
+                        "title": {"type": "string"},
+                        "ingredients": {"type": "string"}
+                    },
+                    "required": ["id", "title", "ingredients"]
+                }
+            }
+        },
+        "required": ["meals"]
+    },
+    "shopping_list": {
+        "type": "object",
+        "properties": {
+            "shopping_list": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "item": {"type": "string"},
+                        "meals": {"type": "array", "items": {"type": "string"}}
+                    },
+                    "required": ["item", "meals"]
+                }
+            }
+        },
+        "required": ["shopping_list"]
+    },
+}
+
+# Tasks that answer several requests of another task in one generation
+BATCH_TASKS = {"meal_batch": "meal"}
+
+# Per-task outcome counts: first_pass, repaired, retried, partial (an invalid streamed response
+# cut down to the entries that arrived complete), failed
+validation_stats = {task: Counter() for task in TASK_SCHEMAS}
+
+
+class SchemaError(ValueError):
+    pass
+
+
+class PartialResponse(SchemaError):
+    # An invalid streamed response, with the entries that did arrive complete
+    def __init__(self, message, items):
+        super().__init__(message)
+        self.items = items
+
+
+def parse_json(text):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    # Fall back to the outermost object or array in the text
+    starts = [i for i in (text.find('{'), text.find('[')) if i != -1]
+    if starts:
+        start = min(starts)
+        end = text.rfind('}' if text[start] == '{' else ']') + 1
+        try:
+            return json.loads(text[start:end])
+        except json.JSONDecodeError:
+            pass
+    raise SchemaError(f"Response is not valid JSON: {text[:200]!r}")
+
+
+def split_lines(value, separators=r"\n"):
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if str(item).strip()]
+    return [line.strip() for line in re.split(separators, str(value)) if line.strip()]
+
+
+def unwrap(data, key):
+    # {"meal": {...}} or [{...}] instead of {...}
+    if isinstance(data, list) and len(data) == 1 and isinstance(data[0], dict):
+        data = data[0]
+    if isinstance(data, dict) and key not in data and len(data) == 1:
+        inner = next(iter(data.values()))
+        if isinstance(inner, dict):
+            data = inner
+    return data
+
+
+def repair_ingredients(data):
+    if isinstance(data, list):
+        data = {"ingredients": data}
+    if not isinstance(data, dict) or "ingredients" not in data:
+        raise SchemaError(f"Expected an object with 'ingredients', got: {data!r}")
+    ingredients = list(dict.fromkeys(split_lines(data["ingredients"], r"[\n,]")))[:10]
+    if not ingredients:
+        raise SchemaError("No valid ingredients found")
+    return ingredients
+
+
+def repair_meal(data):
+    data = unwrap(data, "title")
+    if isinstance(data, dict) and "title" not in data and "name" in data:
+        data = {**data, "title": data["name"]}
+    if not isinstance(data, dict) or not data.get("title") or data.get("ingredients") is None:
+        raise SchemaError(f"Expected an object with 'title' and 'ingredients', got: {data!r}")
+    ingredients = split_lines(data["ingredients"])
+    if not ingredients:
+        raise SchemaError(f"No ingredients for meal {data['title']!r}")
+    return {"title": str(data["title"]).strip(), "ingredients": "\n".join(ingredients)}
+
+
+def repair_meal_batch(data):
+    if isinstance(data, list):
+        data = {"meals": data}
+    if not isinstance(data, dict) or not isinstance(data.get("meals"), list):
+        raise SchemaError(f"Expected an object with a 'meals' array, got: {data!r}")
+    meals = []
+    for position, entry in enumerate(data["meals"]):
+        entry = unwrap(entry, "title")
+        try:
+            meal = repair_meal(entry)
+        except SchemaError:
+            # Left for the caller to regenerate on its own
+            continue
+        try:
+            meal_id = int(entry.get("id", position))
+        except (TypeError, ValueError):
+            meal_id = position
+        meals.append({"id": meal_id, **meal})
+    if not meals:
+        raise SchemaError("No valid meals in batch response")
+    return meals
+
+
+def repair_shopping_list_item(entry):
+    if isinstance(entry, str):
+        entry = {"item": entry, "meals": ["Miscellaneous"]}
+    if isinstance(entry, dict) and "item" not in entry and "name" in entry:
+        entry = {**entry, "item": entry["name"]}
+    if not isinstance(entry, dict) or not str(entry.get("item", "")).strip():
+        raise SchemaError(f"Expected a shopping list entry with 'item', got: {entry!r}")
+    meals = entry.get("meals") or ["Miscellaneous"]
+    if isinstance(meals, str):
+        meals = [meals]
+    return {"item": str(entry["item"]).strip(), "meals": [str(meal) for meal in meals]}
+
+
+def repair_shopping_list(data):
+    if isinstance(data, list):
+        data = {"shopping_list": data}
+    if not isinstance(data, dict) or not isinstance(data.get("shopping_list"), list):
+        raise SchemaError(f"Expected an object with a 'shopping_list' array, got: {data!r}")
+    return [repair_shopping_list_item(entry) for entry in data["shopping_list"]]
+
+
+REPAIRS = {
+    "ingredients": repair_ingredients,
+    "meal": repair_meal,
+    "meal_batch": repair_meal_batch,
+    "shopping_list": repair_shopping_list,
+}
+
+# Repairs for single array entries, for tasks whose output can be streamed entry by entry
+ITEM_REPAIRS = {
+    "shopping_list": repair_shopping_list_item,
+}
+
+
+def is_exact(task, data, result):
+    # True when the model's own output already had the expected shape
+    if task == "meal":
+        return isinstance(data, dict) and data.get("title") == result["title"] and data.get("ingredients") == result["ingredients"]
+    key = {"ingredients": "ingredients", "meal_batch": "meals", "shopping_list": "shopping_list"}[task]
+    return isinstance(data, dict) and data.get(key) == result
+
+
+def validate(task, text):
+    """Parse and validate generated `text` for `task`, repairing near misses.
+    Returns (result, repaired) or raises SchemaError."""
+    try:
+        data = parse_json(text)
+    except SchemaError:
+        if task != "ingredients":
+            raise
+        # Salvage quoted strings from a broken ingredient list
+        data = [item for item in re.findall(r'"([^"]*)"', text) if item != "ingredients"]
+    result = REPAIRS[task](data)
+    return result, not is_exact(task, data, result)
+
+
+def record(task, outcome):
+    validation_stats[task][outcome] += 1
+
+
+def validity_report():
+    report = {}
+    for task, counts in validation_stats.items():
+        requests = sum(counts.values())
+        report[task] = {
+            "requests": requests,
+            **{outcome: counts[outcome] for outcome in ("first_pass", "repaired", "retried", "partial", "failed")},
+            "first_pass_rate": counts["first_pass"] / requests if requests else None,
+        }
+    return report
@@ -0,0 +1,191 @@
+import json
+import logging
+import os
+import re
+
+import httpx
+import numpy as np
+
+from config import *  # Import configuration values
+
+logger = logging.getLogger("meal_planner.semantic_cache")
+
+# Rows scanned per matrix product, keeps memory bounded when the store is memory-mapped
+SEARCH_CHUNK_ROWS = 65536
+
+
+def normalize_request(text):
+    """Canonical form of a request: lowercased, whitespace-collapsed, de-duplicated and
+    sorted items, so "chicken breast, broccoli" and "broccoli\\nChicken Breast" match.
+    Blank-line separated blocks (one per day) keep their order."""
+    blocks = []
+    for block in re.split(r"\n\s*\n", text.strip()):
+        items = {" ".join(item.split()) for item in re.split(r"[\n,;]+", block.lower())}
+        items.discard("")
+        if items:
+            blocks.append("\n".join(sorted(items)))
+    return "\n\n".join(blocks)
+
+
+async def embed(text):
+    async with httpx.AsyncClient() as client:
+        response = await client.post(
+            OLLAMA_EMBED_URL,
+            json={"model": OLLAMA_EMBED_MODEL, "prompt": text},
+            timeout=OLLAMA_TIMEOUT
+        )
+    response.raise_for_status()
+    vector = np.asarray(response.json()["embedding"], dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    if not norm:
+        raise ValueError("Empty embedding returned")
+    return vector / norm
+
+
+class SemanticCache:
+    """Similarity cache over unit-normalised embeddings.
+
+    Vectors live in one contiguous (capacity, dim) float32 matrix, memory-mapped from
+    `<name>.npy` so it survives restarts; values are kept in an append-only `<name>.jsonl`
+    log keyed by row. When full, the least recently used row is overwritten.
+
+    With `exact=True` a similar vector is not enough: the entry must also have been stored
+    for the same normalized request text, for values where small differences in the request
+    matter, such as a shopping list where one added ingredient or moved day changes the answer.
+
+    With `directory=None` the cache is held in memory only, which is what worker processes
+    use, as each would otherwise fill rows of the shared file that the others know nothing about."""
+
+    def __init__(self, name, capacity=SEMANTIC_CACHE_CAPACITY, threshold=SEMANTIC_CACHE_THRESHOLD,
+                 directory=SEMANTIC_CACHE_DIR, exact=False):
+        self.name = name
+        self.capacity = capacity
+        self.threshold = threshold
+        self.exact = exact
+        self.vectors_path = os.path.join(directory, f"{name}.npy") if directory else None
+        self.values_path = os.path.join(directory, f"{name}.jsonl") if directory else None
+        self._vectors = None
+        self._values = []
+        self._keys = []
+        self._last_used = np.zeros(capacity, dtype=np.int64)
+        self._clock = 0
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return self._size
+
+    def _open(self, dim):
+        if self._vectors is not None and self._vectors.shape[1] == dim:
+            return
+        if self.vectors_path is None:
+            self._vectors = np.zeros((self.capacity, dim), dtype=np.float32)
+            self._values = []
+            self._keys = []
+            self._size = 0
+            return
+        os.makedirs(os.path.dirname(self.vectors_path) or ".", exist_ok=True)
+        if self._vectors is None and os.path.exists(self.vectors_path):
+            vectors = np.load(self.vectors_path, mmap_mode="r+")
+            if vectors.shape == (self.capacity, dim) and vectors.dtype == np.float32:
+                self._vectors = vectors
+                self._load_values()
+                return
+            logger.warning(f"Discarding {self.name} cache with shape {vectors.shape}, expected {(self.capacity, dim)}")
+            del vectors
+        self._vectors = np.lib.format.open_memmap(self.vectors_path, mode="w+", dtype=np.float32,
+                                                  shape=(self.capacity, dim))
+        self._values = []
+        self._keys = []
+        self._size = 0
+        open(self.values_path, "w").close()
+
+    def _load_values(self):
+        values = {}
+        if os.path.exists(self.values_path):
+            with open(self.values_path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        values[record["row"]] = (record["value"], record.get("key"))
+                    except (json.JSONDecodeError, KeyError):
+                        continue
+        # Rows are filled in order, so the first gap marks the end of the valid region
+        self._size = 0
+        while self._size in values and self._size < self.capacity:
+            self._size += 1
+        self._values = [values[row][0] for row in range(self._size)]
+        self._keys = [values[row][1] for row in range(self._size)]
+        self._last_used[:self._size] = np.arange(self._size)
+        self._clock = self._size
+        # Compact the log so it does not grow without bound across evictions
+        with open(self.values_path, "w") as f:
+            for row, (value, key) in enumerate(zip(self._values, self._keys)):
+                f.write(json.dumps({"row": row, "key": key, "value": value}) + "\n")
+
+    def _touch(self, row):
+        self._clock += 1
+        self._last_used[row] = self._clock
+
+    def search(self, queries):
+        """Best match for each row of `queries`, as (row indices, cosine similarities)."""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        best_rows = np.full(len(queries), -1, dtype=np.int64)
+        best_scores = np.full(len(queries), -np.inf, dtype=np.float32)
+        if self._vectors is None or queries.shape[1] != self._vectors.shape[1]:
+            return best_rows, best_scores
+        columns = np.arange(len(queries))
+        for start in range(0, self._size, SEARCH_CHUNK_ROWS):
+            block = self._vectors[start:min(start + SEARCH_CHUNK_ROWS, self._size)]
+            scores = block @ queries.T
+            rows = scores.argmax(axis=0)
+            row_scores = scores[rows, columns]
+            better = row_scores > best_scores
+            best_rows[better] = rows[better] + start
+            best_scores[better] = row_scores[better]
+        return best_rows, best_scores
+
+    def match(self, vector, key=None):
+        # Row answering `vector` (and `key` when exact), or None
+        rows, scores = self.search(vector)
+        row = int(rows[0])
+        if row < 0 or scores[0] < self.threshold or (self.exact and self._keys[row] != key):
+            return None
+        return row
+
+    def lookup(self, vector, key=None):
+        row = self.match(vector, key)
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._touch(row)
+        return self._values[row]
+
+    def store(self, vector, value, key=None):
+        self._open(len(vector))
+        # An entry that answers the same requests is replaced, e.g. after a regeneration
+        row = self.match(vector, key)
+        if row is None and self._size < self.capacity:
+            row = self._size
+            self._size += 1
+            self._values.append(value)
+            self._keys.append(key)
+        else:
+            if row is None:
+                row = int(self._last_used.argmin())
+            self._values[row] = value
+            self._keys[row] = key
+        self._vectors[row] = vector
+        self._touch(row)
+        if self.values_path is not None:
+            with open(self.values_path, "a") as f:
+                f.write(json.dumps({"row": row, "key": key, "value": value}) + "\n")
+
+    async def get(self, text):
+        """Embed the normalized `text` and return (cached value or None, embedding, normalized text)."""
+        key = normalize_request(text)
+        vector = await embed(key)
+        self._open(len(vector))
+        return self.lookup(vector, key), vector, key
@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+
+from batching import MicroBatcher
+
+
+class Backend:
+    def __init__(self, batch_results=None, batch_error=None, failing=()):
+        self.batches = []
+        self.singles = []
+        self.batch_results = batch_results
+        self.batch_error = batch_error
+        self.failing = failing
+
+    async def run_batch(self, requests):
+        self.batches.append(requests)
+        await asyncio.sleep(0.01)
+        if self.batch_error:
+            raise self.batch_error
+        if self.batch_results is not None:
+            return self.batch_results(requests)
+        return [f"batch:{request}" for request in requests]
+
+    async def run_one(self, request):
+        self.singles.append(request)
+        await asyncio.sleep(0.01)
+        if request in self.failing:
+            raise ValueError(f"failed {request}")
+        return f"single:{request}"
+
+
+def batcher(backend, window=0.05, max_size=4, max_in_flight=0):
+    return MicroBatcher("test", backend.run_batch, backend.run_one, window, max_size, max_in_flight)
+
+
+async def submit_all(micro, requests):
+    return await asyncio.gather(*(micro.submit(request) for request in requests), return_exceptions=True)
+
+
+def test_concurrent_requests_share_a_batch():
+    backend = Backend()
+    micro = batcher(backend)
+    assert asyncio.run(submit_all(micro, ["a", "b", "c"])) == ["batch:a", "batch:b", "batch:c"]
+    assert backend.batches == [["a", "b", "c"]]
+    assert micro.metrics()["mean_batch_size"] == 3
+
+
+def test_full_batch_is_sent_without_waiting_and_rest_follows():
+    backend = Backend()
+    micro = batcher(backend, window=10, max_size=2)
+
+    async def run():
+        return await asyncio.wait_for(submit_all(micro, ["a", "b", "c", "d"]), 1)
+
+    assert asyncio.run(run()) == ["batch:a", "batch:b", "batch:c", "batch:d"]
+    assert backend.batches == [["a", "b"], ["c", "d"]]
+
+
+def test_lone_request_on_idle_backend_is_sent_at_once():
+    backend = Backend()
+    micro = batcher(backend, window=10, max_in_flight=1)
+
+    async def run():
+        return await asyncio.wait_for(micro.submit("a"), 1)
+
+    assert asyncio.run(run()) == "single:a"
+    assert backend.batches == []
+
+
+def test_missing_batch_results_fall_back_to_single_requests():
+    backend = Backend(batch_results=lambda requests: [None if request == "b" else f"batch:{request}" for request in requests])
+    micro = batcher(backend)
+    assert asyncio.run(submit_all(micro, ["a", "b", "c"])) == ["batch:a", "single:b", "batch:c"]
+    assert backend.singles == ["b"]
+    assert micro.metrics()["fallbacks"] == 1
+
+
+def test_failed_batch_falls_back_to_single_requests():
+    backend = Backend(batch_error=RuntimeError("backend down"))
+    micro = batcher(backend)
+    assert asyncio.run(submit_all(micro, ["a", "b"])) == ["single:a", "single:b"]
+    assert micro.metrics()["fallbacks"] == 2
+
+
+def test_single_request_error_reaches_only_its_caller():
+    backend = Backend(batch_error=RuntimeError("backend down"), failing=("b",))
+    results = asyncio.run(submit_all(batcher(backend), ["a", "b"]))
+    assert results[0] == "single:a"
+    assert isinstance(results[1], ValueError)
+
+
+def test_cancelled_requests_are_not_generated():
+    backend = Backend()
+    micro = batcher(backend)
+
+    async def run():
+        cancelled = asyncio.create_task(micro.submit("a"))
+        kept = asyncio.create_task(micro.submit("b"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        return await kept
+
+    assert asyncio.run(run()) == "single:b"
+    assert backend.batches == []
+    assert backend.singles == ["b"]
+    assert micro.metrics()["in_flight"] == 0
+
+
+def test_caller_cancelled_during_batch_does_not_disturb_the_others():
+    backend = Backend()
+    micro = batcher(backend, max_size=2)
+
+    async def run():
+        cancelled = asyncio.create_task(micro.submit("a"))
+        kept = asyncio.create_task(micro.submit("b"))
+        await asyncio.sleep(0.005)
+        assert backend.batches == [["a", "b"]]
+        cancelled.cancel()
+        result = await kept
+        await asyncio.gather(*micro.tasks)
+        return result
+
+    assert asyncio.run(run()) == "batch:b"
+    assert micro.metrics()["in_flight"] == 0
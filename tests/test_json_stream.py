@@ -0,0 +1,53 @@
+import json
+
+from json_stream import ArrayItemParser
+
+SHOPPING_LIST = {"shopping_list": [
+    {"item": "Tofu {firm}", "meals": ["Mon: \"Stir-Fry\" }"]},
+    {"item": "Back\\slash", "meals": ["[Misc]"]},
+    {"item": "Rice", "meals": []},
+]}
+
+
+def feed_all(parser, chunks):
+    return [item for chunk in chunks for item in parser.feed(chunk)]
+
+
+def test_items_are_returned_when_they_close():
+    parser = ArrayItemParser()
+    assert parser.feed('{"shopping_list": [{"item": "Tofu", "meals": ["Mon"]}') == [{"item": "Tofu", "meals": ["Mon"]}]
+    assert parser.feed(', {"item": "Ri') == []
+    assert parser.feed('ce", "meals": []}]}') == [{"item": "Rice", "meals": []}]
+
+
+def test_braces_and_escapes_inside_strings():
+    text = json.dumps(SHOPPING_LIST)
+    assert feed_all(ArrayItemParser(), [text]) == SHOPPING_LIST["shopping_list"]
+
+
+def test_any_chunking_gives_the_same_items():
+    text = json.dumps(SHOPPING_LIST)
+    for size in (1, 2, 3, 7):
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        assert feed_all(ArrayItemParser(), chunks) == SHOPPING_LIST["shopping_list"]
+
+
+def test_truncated_stream_keeps_complete_items():
+    text = json.dumps(SHOPPING_LIST)
+    cut = text.index('{"item": "Rice"') + 10
+    assert feed_all(ArrayItemParser(), [text[:cut]]) == SHOPPING_LIST["shopping_list"][:2]
+
+
+def test_cut_inside_an_escape():
+    parser = ArrayItemParser()
+    assert parser.feed('{"list": [{"item": "a\\') == []
+    assert parser.feed('"}"}]}') == [{"item": 'a"}'}]
+
+
+def test_nested_objects_are_part_of_their_item():
+    text = '{"meals": [{"id": 0, "meta": {"tags": [{"a": 1}]}}, {"id": 1}]}'
+    assert feed_all(ArrayItemParser(), [text]) == [{"id": 0, "meta": {"tags": [{"a": 1}]}}, {"id": 1}]
+
+
+def test_top_level_array():
+    assert feed_all(ArrayItemParser(), ['[{"item": "Salt"}, {"item": "Pepper"}]']) == [{"item": "Salt"}, {"item": "Pepper"}]
@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from schemas import SchemaError, validate
+
+
+def test_exact_meal_is_not_repaired():
+    text = json.dumps({"title": "Lentil Curry", "ingredients": "lentils\nrice"})
+    assert validate("meal", text) == ({"title": "Lentil Curry", "ingredients": "lentils\nrice"}, False)
+
+
+@pytest.mark.parametrize("text", [
+    '{"meal": {"title": "Lentil Curry", "ingredients": "lentils\\nrice"}}',
+    '[{"title": "Lentil Curry", "ingredients": ["lentils", "rice"]}]',
+    '{"name": "Lentil Curry", "ingredients": "  lentils\\n\\nrice  "}',
+    'Here you go: {"title": "Lentil Curry", "ingredients": "lentils\\nrice"} Enjoy!',
+])
+def test_meal_near_misses_are_repaired(text):
+    assert validate("meal", text)[0] == {"title": "Lentil Curry", "ingredients": "lentils\nrice"}
+
+
+def test_meal_ingredients_keep_commas():
+    meal, _ = validate("meal", '{"title": "Pasta", "ingredients": "tomatoes, chopped\\nbasil"}')
+    assert meal["ingredients"] == "tomatoes, chopped\nbasil"
+
+
+@pytest.mark.parametrize("text", [
+    '{"title": "Pasta", "ingredients": null}',
+    '{"title": "Pasta", "ingredients": " \\n "}',
+    '{"title": "Pasta", "ingredients": []}',
+    '{"title": "Pasta"}',
+    '{"title": "", "ingredients": "basil"}',
+    '["Pasta", "basil"]',
+    'not json at all',
+])
+def test_invalid_meals_are_rejected(text):
+    with pytest.raises(SchemaError):
+        validate("meal", text)
+
+
+def test_meal_batch_keeps_valid_entries_and_ids():
+    text = json.dumps({"meals": [
+        {"id": 1, "title": "Stir-Fry", "ingredients": "tofu"},
+        {"id": 0, "title": "", "ingredients": "rice"},
+        [{"id": 0, "title": "Curry", "ingredients": "lentils"}],
+        {"title": "Tacos", "ingredients": "beans"},
+        [1, 2],
+    ]})
+    meals, repaired = validate("meal_batch", text)
+    assert meals == [
+        {"id": 1, "title": "Stir-Fry", "ingredients": "tofu"},
+        {"id": 0, "title": "Curry", "ingredients": "lentils"},
+        {"id": 3, "title": "Tacos", "ingredients": "beans"},
+    ]
+    assert repaired
+
+
+@pytest.mark.parametrize("text", ['{"meals": []}', '{"meals": [{"id": 0, "title": "x"}]}', '{"meals": "none"}'])
+def test_meal_batch_without_valid_meals_is_rejected(text):
+    with pytest.raises(SchemaError):
+        validate("meal_batch", text)
+
+
+def test_ingredients_are_split_and_deduplicated():
+    ingredients, repaired = validate("ingredients", '{"ingredients": "Salmon, Tofu\\nsalmon\\nSalmon\\n \\nRice"}')
+    assert ingredients == ["Salmon", "Tofu", "salmon", "Rice"]
+    assert repaired
+
+
+def test_ingredients_are_salvaged_from_broken_json():
+    ingredients, _ = validate("ingredients", '{"ingredients": ["Salmon", "Tofu", "Ri')
+    assert ingredients == ["Salmon", "Tofu"]
+
+
+def test_shopping_list_entries_are_repaired():
+    text = json.dumps({"shopping_list": ["Salt", {"name": "Tofu", "meals": "Monday: Stir-Fry"}, {"item": "Rice", "meals": []}]})
+    assert validate("shopping_list", text)[0] == [
+        {"item": "Salt", "meals": ["Miscellaneous"]},
+        {"item": "Tofu", "meals": ["Monday: Stir-Fry"]},
+        {"item": "Rice", "meals": ["Miscellaneous"]},
+    ]
+
+
+@pytest.mark.parametrize("text", ['{"shopping_list": [{"item": " ", "meals": []}]}', '{"items": []}'])
+def test_invalid_shopping_lists_are_rejected(text):
+    with pytest.raises(SchemaError):
+        validate("shopping_list", text)
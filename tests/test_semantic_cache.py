@@ -0,0 +1,49 @@
+import numpy as np
+
+from semantic_cache import SemanticCache, normalize_request
+
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_normalize_request_ignores_order_case_and_duplicates():
+    assert normalize_request("Chicken Breast, broccoli\nbroccoli") == normalize_request("broccoli\n chicken  breast")
+    assert normalize_request("Mon: tofu\n\nTue: rice") != normalize_request("Tue: rice\n\nMon: tofu")
+
+
+def test_similar_vectors_hit():
+    cache = SemanticCache("meals", capacity=4, threshold=0.97, directory=None)
+    cache.store(unit(1, 0, 0), "curry", "lentils")
+    assert cache.lookup(unit(1, 0.05, 0), "lentils, rice") == "curry"
+    assert cache.lookup(unit(0, 1, 0)) is None
+
+
+def test_exact_cache_needs_the_same_request():
+    cache = SemanticCache("shopping_lists", capacity=4, threshold=0.97, directory=None, exact=True)
+    cache.store(unit(1, 0, 0), ["tofu"], "mon: tofu")
+    assert cache.lookup(unit(1, 0.01, 0), "mon: tofu\nsour cream") is None
+    assert cache.lookup(unit(1, 0, 0), "mon: tofu") == ["tofu"]
+
+
+def test_store_replaces_the_entry_it_would_answer():
+    cache = SemanticCache("meals", capacity=4, threshold=0.97, directory=None)
+    cache.store(unit(1, 0, 0), "curry", "lentils")
+    cache.store(unit(1, 0, 0), "dal", "lentils")
+    assert len(cache) == 1
+    assert cache.lookup(unit(1, 0, 0), "lentils") == "dal"
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = SemanticCache("meals", capacity=2, threshold=0.97, directory=str(tmp_path))
+    cache.store(unit(1, 0, 0), "a")
+    cache.store(unit(0, 1, 0), "b")
+    cache.lookup(unit(1, 0, 0))
+    cache.store(unit(0, 0, 1), "c")
+    assert cache.lookup(unit(0, 1, 0)) is None
+    assert cache.lookup(unit(1, 0, 0)) == "a"
+
+    reopened = SemanticCache("meals", capacity=2, threshold=0.97, directory=str(tmp_path))
+    reopened._open(3)
+    assert reopened.lookup(unit(0, 0, 1)) == "c"